@@ -790,6 +790,19 @@ def size():
 resolution = size  # resolution() is an alias for size()
 
 
+def invalidateScreenSize():
+    """Forgets the screen size that some platforms (currently Wayland) cache
+    after the first size() call, so that the next call queries it again. Call
+    this after the screen resolution changes or a monitor is plugged in or
+    removed. On platforms that don't cache the size this does nothing.
+
+    Returns:
+      None
+    """
+    if hasattr(platformModule, "_clear_size_cache"):
+        platformModule._clear_size_cache()
+
+
 def onScreen(x, y=None):
     """Returns whether the given xy coordinates are on the primary screen or not.
 
@@ -1612,11 +1625,18 @@ def press(keys, presses=1, interval=0.0, logScreenshot=None, _pause=True):
         keys = lowerKeys
     interval = float(interval)
     _logScreenshot(logScreenshot, "press", ",".join(keys), folder=".")
+    # Pick the press function once rather than for every key. Some platforms can send the down and up events
+    # together, e.g. in a single libei frame on Wayland.
+    if hasattr(platformModule, "_press"):
+        pressKey = platformModule._press
+    else:
+        def pressKey(k):
+            platformModule._keyDown(k)
+            platformModule._keyUp(k)
     for i in range(presses):
         for k in keys:
             failSafeCheck()
-            platformModule._keyDown(k)
-            platformModule._keyUp(k)
+            pressKey(k)
         time.sleep(interval)
 
 
@@ -1683,6 +1703,11 @@ def typewrite(message, interval=0.0, logScreenshot=None, _pause=True):
     interval = float(interval)  # TODO - this should be taken out.
 
     _logScreenshot(logScreenshot, "write", message, folder=".")
+    if interval == 0.0 and hasattr(platformModule, "_typewrite"):
+        # Some platforms can send the whole message at once, e.g. in a single libei frame on Wayland.
+        platformModule._typewrite([c.lower() if len(c) > 1 else c for c in message])
+        failSafeCheck()
+        return
     for c in message:
         if len(c) > 1:
             c = c.lower()
@@ -1733,6 +1758,29 @@ def hotkey(*args, **kwargs):
 shortcut = hotkey  # shortcut() is an alias for htotkey()
 
 
+@contextmanager
+def batch():
+    """Context manager that groups the mouse and keyboard events performed in the
+    with-block, so that they are delivered to the operating system together. To
+    keep the events in order, each run of mouse events is delivered when the
+    block switches to the keyboard and vice versa, and the last run is delivered
+    when the block exits.
+
+    Only platforms whose input API supports batching (currently Wayland) group
+    the events. Everywhere else this does nothing and events are sent immediately.
+    Since batched events arrive all at once, durations and intervals used inside
+    the block don't produce visible motion or pauses on those platforms.
+
+    Returns:
+      None
+    """
+    if hasattr(platformModule, "_batch"):
+        with platformModule._batch():
+            yield
+    else:
+        yield
+
+
 def failSafeCheck():
     if FAILSAFE and tuple(position()) in FAILSAFE_POINTS:
         raise FailSafeException(
@@ -3,7 +3,7 @@ import sys
 
 try:
     import Quartz
-except:
+except ImportError:
     assert False, "You must first install pyobjc-core and pyobjc: https://pyautogui.readthedocs.io/en/latest/install.html"
 import AppKit
 
@@ -1,16 +1,33 @@
 # pyautogui_snegg.py - PyAutoGUI implementation using snegg (Python wrapper for libei)
 
-import pyautogui
 import sys
 import os
+import re
+import string
+import types
+import atexit
 import subprocess
-from pyautogui import LEFT, MIDDLE, RIGHT
-from pathlib import Path
+import time
+from contextlib import contextmanager
 
-# Import snegg module for libei
-import snegg.ei
+# python-xlib is optional here; it's only used to query XWayland directly instead of running external tools.
+try:
+    from Xlib.display import Display
+    import Xlib.error
+except ImportError:
+    Display = None
 
-BUTTON_NAME_MAPPING = {LEFT: 1, MIDDLE: 2, RIGHT: 3, 1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 6: 6, 7: 7}
+# Map from PyAutoGUI button names and X11 button numbers to linux/input-event-codes.h button codes, which is what
+# libei expects. The values of pyautogui.LEFT, MIDDLE and RIGHT are spelled out so this backend doesn't have to import
+# pyautogui.
+BUTTON_NAME_MAPPING = {
+    'left': 0x110,    # BTN_LEFT
+    'middle': 0x112,  # BTN_MIDDLE
+    'right': 0x111,   # BTN_RIGHT
+    1: 0x110,         # BTN_LEFT
+    2: 0x112,         # BTN_MIDDLE
+    3: 0x111,         # BTN_RIGHT
+}
 
 if sys.platform in ('java', 'darwin', 'win32'):
     raise Exception('The pyautogui_snegg module should only be loaded on a Unix system that supports libei.')
@@ -21,10 +38,43 @@ _pointer = None
 _keyboard = None
 _emulating = False
 
-def _ensure_connected():
+# Set whenever an event has been sent on that device that has not yet been committed with a frame(), so that
+# _flush() only frames the devices that actually sent something.
+_pointer_pending = False
+_keyboard_pending = False
+
+# How many _batch() blocks are currently open. While this is non-zero, _flush() leaves the events queued.
+_batch_depth = 0
+
+# The last coordinates this module moved the pointer to, and when, so redundant motion events can be skipped.
+_last_known_position = None
+_last_known_time = 0.0
+
+# The last position _position() read back from the X server, and when. This is kept apart from _last_known_position
+# because XWayland reports a stale position while the pointer is over a native Wayland window, so a read position
+# is only good for serving back-to-back queries, never for skipping a motion event.
+_last_read_position = None
+_last_read_time = 0.0
+
+# How long (in seconds) the pointer is trusted to still be at _last_known_position. The user can move the physical
+# mouse at any time, so the cached position is only relied on shortly after it was last set.
+_POSITION_CACHE_TTL = 0.1
+
+# _position() uses a much shorter window, well below pyautogui.MINIMUM_SLEEP, so that the fail-safe check between
+# the steps of a tweened move still sees where the user actually put the mouse.
+_POSITION_QUERY_TTL = 0.005
+
+def _noop():
+    """Stands in for _ensure_connected() and _start_emulating() once their one-time work is done."""
+
+def _connect():
     """Ensures that we have an active connection to the libei server."""
-    global _client, _pointer, _keyboard
+    global _client, _pointer, _keyboard, _ensure_connected
     if _client is None:
+        # Import snegg module for libei. This is deferred until the first input event, so that importing pyautogui
+        # for screen queries alone doesn't pay for loading libei.
+        import snegg.ei
+        
         # Initialize snegg client connection for input sending
         # Using socket connection with default path (uses LIBEI_SOCKET env var)
         _client = snegg.ei.Sender.create_for_socket(None, "PyAutoGUI")
@@ -48,63 +98,229 @@ def _ensure_connected():
                 seat.bind(capabilities)
                 break
         
-        # Wait for device creation events
+        # Wait for device creation events, and stop looking once both devices have been found
         _client.dispatch()
         for event in _client.events:
             if event.event_type == snegg.ei.EventType.DEVICE_ADDED:
                 device = event.device
-                if snegg.ei.DeviceCapability.POINTER in device.capabilities:
+                capabilities = device.capabilities
+                if snegg.ei.DeviceCapability.POINTER in capabilities:
                     _pointer = device
-                if snegg.ei.DeviceCapability.KEYBOARD in device.capabilities:
+                if snegg.ei.DeviceCapability.KEYBOARD in capabilities:
                     _keyboard = device
+                if _pointer is not None and _keyboard is not None:
+                    break
+        
+        # Stop emulating when the interpreter exits. This only runs once, on the first connection.
+        atexit.register(_stop_emulating)
+    
+    # The connection is never closed, so every later call can skip this check entirely
+    _ensure_connected = _noop
 
-def _start_emulating():
+def _begin_emulating():
     """Start emulating if not already emulating."""
-    global _emulating
+    global _emulating, _start_emulating
     if not _emulating:
         if _pointer:
             _pointer.start_emulating()
         if _keyboard:
             _keyboard.start_emulating()
         _emulating = True
+    # Emulation stays on until _stop_emulating(), so skip this check entirely until then
+    _start_emulating = _noop
 
 def _stop_emulating():
     """Stop emulating."""
-    global _emulating
+    global _emulating, _start_emulating
     if _emulating:
         if _pointer:
             _pointer.stop_emulating()
         if _keyboard:
             _keyboard.stop_emulating()
         _emulating = False
+    _start_emulating = _begin_emulating
+
+# The hot paths call these through the module globals, which _connect() and _begin_emulating() swap for _noop() once
+# they have done their work, so the connection and emulation state aren't re-checked on every input event.
+_ensure_connected = _connect
+_start_emulating = _begin_emulating
+
+def _flush():
+    """Commits all queued events to the server with a single frame() per device that sent any."""
+    global _pointer_pending, _keyboard_pending
+    if _batch_depth:
+        return
+    if _pointer_pending:
+        _pointer_pending = False
+        _pointer.frame()
+        if _keyboard is _pointer:
+            # A single device for both capabilities only needs the one frame
+            _keyboard_pending = False
+    if _keyboard_pending:
+        _keyboard_pending = False
+        _keyboard.frame()
+
+def _use_pointer():
+    """Marks the pointer as having queued events. Call this before sending pointer events."""
+    global _pointer_pending, _keyboard_pending
+    # Inside a _batch() block the keyboard may still have queued events. Frame them first, since only frame() hands a
+    # device's events to the server, so the two devices' events are committed in the order they were sent.
+    if _keyboard_pending and _keyboard is not _pointer:
+        _keyboard_pending = False
+        _keyboard.frame()
+    _pointer_pending = True
+
+def _use_keyboard():
+    """Marks the keyboard as having queued events. Call this before sending keyboard events."""
+    global _pointer_pending, _keyboard_pending
+    # See _use_pointer()
+    if _pointer_pending and _pointer is not _keyboard:
+        _pointer_pending = False
+        _pointer.frame()
+    _keyboard_pending = True
+
+# Set to False once xdotool turns out not to be installed, so _position() stops trying to run it.
+_xdotool_available = True
+
+# Connection to the X server (XWayland), opened on first use by _get_xdisplay() and then reused.
+_xdisplay = None
+
+def _get_xdisplay():
+    """Returns the shared connection to the X server, or None if there is no X server to connect to."""
+    global _xdisplay
+    if _xdisplay is None:
+        if Display is None or not os.environ.get('DISPLAY'):
+            return None
+        try:
+            _xdisplay = Display()
+        except Xlib.error.DisplayError:
+            return None
+    return _xdisplay
+
+@contextmanager
+def _batch():
+    """Context manager that holds back frame() commits until the outermost block exits, so that all of the events
+    sent inside it are committed together."""
+    global _batch_depth
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+        _flush()
 
 def _position():
     """Returns the current xy coordinates of the mouse cursor as a two-integer tuple."""
-    # snegg/libei doesn't provide position query, use external tool
-    import subprocess
-    try:
-        output = subprocess.check_output(['xdotool', 'getmouselocation'])
-        parts = output.decode().strip().split()
-        x = int(parts[0].split(':')[1])
-        y = int(parts[1].split(':')[1])
-        return x, y
-    except (subprocess.SubprocessError, IndexError, ValueError):
-        return 0, 0
+    global _xdotool_available, _xdisplay
+    # Reuse the position this module just moved the pointer to or just read, so that back-to-back queries such as
+    # the fail-safe check after every move don't each query the X server.
+    now = time.monotonic()
+    if _last_known_time > _last_read_time:
+        if now - _last_known_time < _POSITION_QUERY_TTL:
+            return _last_known_position
+    elif _last_read_position is not None and now - _last_read_time < _POSITION_QUERY_TTL:
+        return _last_read_position
+    
+    # snegg/libei doesn't provide position query, so ask the X server directly. This is the same query xdotool
+    # makes, without spawning a process for it.
+    display = _get_xdisplay()
+    if display is not None:
+        try:
+            pointer = display.screen().root.query_pointer()
+            _remember_read_position(pointer.root_x, pointer.root_y)
+            return pointer.root_x, pointer.root_y
+        except Xlib.error.ConnectionClosedError:
+            # The X server went away (e.g. XWayland was restarted), so reconnect on the next call
+            _xdisplay = None
+        except Xlib.error.XError:
+            pass
+    
+    # Otherwise use external tool
+    if _xdotool_available:
+        try:
+            output = subprocess.check_output(['xdotool', 'getmouselocation'])
+            parts = output.decode().strip().split()
+            x = int(parts[0].split(':')[1])
+            y = int(parts[1].split(':')[1])
+            _remember_read_position(x, y)
+            return x, y
+        except FileNotFoundError:
+            _xdotool_available = False
+        except (subprocess.SubprocessError, IndexError, ValueError):
+            pass
+    
+    # Fall back to the last position this module moved the pointer to or read
+    if _last_known_time > _last_read_time:
+        return _last_known_position
+    if _last_read_position is not None:
+        return _last_read_position
+    return 0, 0
+
+def _remember_read_position(x, y):
+    """Records that _position() just read (x, y) from the X server."""
+    global _last_read_position, _last_read_time
+    _last_read_position = (x, y)
+    _last_read_time = time.monotonic()
+
+# Matches the resolution of the primary output in `xrandr --current` output, e.g. "eDP-1 connected primary 1920x1080+0+0".
+_PRIMARY_SIZE_RE = re.compile(rb' connected primary (\d+)x(\d+)\+')
+
+_cached_size = None
 
 def _size():
     """Returns the width and height of the screen."""
+    # The screen size is queried once and then cached, since querying it may require running an external tool.
+    global _cached_size
+    if _cached_size is None:
+        _cached_size = _query_size()
+    return _cached_size
+
+def _clear_size_cache():
+    """Forgets the cached screen size, so the next _size() call queries it again (e.g. after a monitor change)."""
+    global _cached_size
+    _cached_size = None
+
+def _query_size():
+    """Queries the width and height of the primary screen, from the X server if possible and otherwise from xrandr."""
+    size = _query_size_xlib()
+    if size is not None:
+        return size
+    return _query_size_xrandr()
+
+def _query_size_xlib():
+    """Returns the size of the primary output using the RandR extension, or None if it can't be determined."""
+    global _xdisplay
+    display = _get_xdisplay()
+    if display is None:
+        return None
+    try:
+        root = display.screen().root
+        resources = root.xrandr_get_screen_resources_current()
+        output = display.xrandr_get_output_info(root.xrandr_get_output_primary().output, resources.config_timestamp)
+        crtc = display.xrandr_get_crtc_info(output.crtc, resources.config_timestamp)
+    except Xlib.error.ConnectionClosedError:
+        # The X server went away, so reconnect on the next call
+        _xdisplay = None
+        return None
+    except (Xlib.error.XError, AttributeError):
+        # AttributeError means the server doesn't support RandR
+        return None
+    if crtc.width and crtc.height:
+        return crtc.width, crtc.height
+    return None
+
+def _query_size_xrandr():
+    """Queries the width and height of the primary screen from xrandr."""
     # Using external tools for screen size
-    import subprocess
     try:
-        output = subprocess.check_output(['xrandr', '--current'])
-        for line in output.decode().split('\n'):
-            if ' connected' in line and 'primary' in line:
-                parts = line.split()
-                for part in parts:
-                    if 'x' in part and part[0].isdigit():
-                        width, height = map(int, part.split('x')[0].split('+')[0].split('x'))
-                        return width, height
-    except (subprocess.SubprocessError, IndexError, ValueError):
+        # The timeout keeps a hung X server from stalling the first size query indefinitely.
+        output = subprocess.check_output(['xrandr', '--current'], timeout=2)
+        # The pattern is matched against the raw bytes, so the output doesn't need decoding
+        match = _PRIMARY_SIZE_RE.search(output)
+        if match:
+            return int(match.group(1)), int(match.group(2))
+    except (OSError, subprocess.SubprocessError):
+        # OSError covers xrandr not being installed at all
         pass
     
     # Default fallback
@@ -119,26 +335,25 @@ def _vscroll(clicks, x=None, y=None):
     _ensure_connected()
     _start_emulating()
     
-    if x is None or y is None:
-        x, y = _position()
+    # Without coordinates, scroll wherever the pointer is. pyautogui.scroll() fills in the coordinates from
+    # position() when the caller gave none, so a position that was just read counts as "wherever the pointer is" too.
+    if x is not None and y is not None and not _at_known_position(x, y) and not _at_read_position(x, y):
+        _send_motion(x, y)
     
-    # Move to position first
-    _pointer.pointer_motion_absolute(x, y)
-    
-    # Scroll in the appropriate direction
+    # Scroll in the appropriate direction. The sign of the amount already encodes the direction.
     # Note: For scroll wheel, negative is up, positive is down (opposite of X11 button numbers)
-    direction = -1 if clicks > 0 else 1
+    amount = -clicks
     
-    for _ in range(abs(clicks)):
-        # Use scroll delta for continuous scrolling
-        _pointer.scroll_delta(0, direction)
-        # Also send discrete scroll events for compatibility
-        _pointer.scroll_discrete(0, direction)
-        _pointer.frame()
+    # libei accepts arbitrary scroll amounts, so all of the clicks are sent as a single event
+    # Use scroll delta for continuous scrolling
+    _use_pointer()
+    _pointer.scroll_delta(0, amount)
+    # Also send discrete scroll events for compatibility
+    _pointer.scroll_discrete(0, amount)
     
-    # Send scroll stop event
+    # Send scroll stop event, committed in the same frame as the scroll itself
     _pointer.scroll_stop(False, True)
-    _pointer.frame()
+    _flush()
 
 def _hscroll(clicks, x=None, y=None):
     """Performs horizontal scrolling."""
@@ -149,25 +364,22 @@ def _hscroll(clicks, x=None, y=None):
     _ensure_connected()
     _start_emulating()
     
-    if x is None or y is None:
-        x, y = _position()
+    # Without coordinates, scroll wherever the pointer is. pyautogui.scroll() fills in the coordinates from
+    # position() when the caller gave none, so a position that was just read counts as "wherever the pointer is" too.
+    if x is not None and y is not None and not _at_known_position(x, y) and not _at_read_position(x, y):
+        _send_motion(x, y)
     
-    # Move to position first
-    _pointer.pointer_motion_absolute(x, y)
+    # Scroll in the appropriate direction. The sign of clicks already encodes the direction.
+    # libei accepts arbitrary scroll amounts, so all of the clicks are sent as a single event
+    # Use scroll delta for continuous scrolling
+    _use_pointer()
+    _pointer.scroll_delta(clicks, 0)
+    # Also send discrete scroll events for compatibility
+    _pointer.scroll_discrete(clicks, 0)
     
-    # Scroll in the appropriate direction
-    direction = 1 if clicks > 0 else -1
-    
-    for _ in range(abs(clicks)):
-        # Use scroll delta for continuous scrolling
-        _pointer.scroll_delta(direction, 0)
-        # Also send discrete scroll events for compatibility
-        _pointer.scroll_discrete(direction, 0)
-        _pointer.frame()
-    
-    # Send scroll stop event
+    # Send scroll stop event, committed in the same frame as the scroll itself
     _pointer.scroll_stop(True, False)
-    _pointer.frame()
+    _flush()
 
 def _scroll(clicks, x=None, y=None):
     """Default scroll function is vertical scrolling."""
@@ -175,11 +387,32 @@ def _scroll(clicks, x=None, y=None):
 
 def _click(x, y, button):
     """Performs a mouse click (down and up)."""
-    assert button in BUTTON_NAME_MAPPING.keys(), "button argument not in ('left', 'middle', 'right', 4, 5, 6, 7)"
-    button = BUTTON_NAME_MAPPING[button]
+    # X11 buttons 4 to 7 are the scroll wheel, which libei has no buttons for
+    scroll = _SCROLL_BUTTONS.get(button)
+    if scroll is not None:
+        scroll[0](scroll[1], x, y)
+        return
+    
+    # Look the button up once and skip re-validating it for the press and the release.
+    code = _button_code(button)
+    
+    _ensure_connected()
+    _start_emulating()
     
-    _mouseDown(x, y, button)
-    _mouseUp(x, y, button)
+    # The motion, press and release are all committed with a single frame.
+    _queue_button(x, y, code, True)
+    _queue_button(x, y, code, False)
+    _flush()
+
+def _button_code(button):
+    """Returns the libei button code for the button name or number, raising ValueError for unknown buttons."""
+    code = BUTTON_NAME_MAPPING.get(button)
+    if code is None:
+        raise ValueError("button argument not in ('left', 'middle', 'right', 1, 2, 3, 4, 5, 6, 7)")
+    return code
+
+# X11 scroll wheel buttons, as the scroll function and number of clicks that pressing each of them performs.
+_SCROLL_BUTTONS = {4: (_vscroll, 1), 5: (_vscroll, -1), 6: (_hscroll, -1), 7: (_hscroll, 1)}
 
 _mouse_is_swapped_setting = None
 
@@ -187,209 +420,294 @@ def _mouse_is_swapped():
     """Detects if mouse buttons are swapped in the system."""
     global _mouse_is_swapped_setting
     if _mouse_is_swapped_setting is None:
-        try:
-            proc = subprocess.Popen(['dconf', 'read', '/org/gnome/desktop/peripherals/mouse/left-handed'], stdout=subprocess.PIPE)
-            stdout_bytes, stderr_bytes = proc.communicate()
-            _mouse_is_swapped_setting = stdout_bytes.decode('utf-8') == 'true\n'
-        except FileNotFoundError:
-            # Non-Gnome environment, assume not swapped
-            _mouse_is_swapped_setting = False
+        _mouse_is_swapped_setting = _query_mouse_is_swapped()
     return _mouse_is_swapped_setting
 
+def _query_mouse_is_swapped():
+    """Reads GNOME's left-handed mouse setting, without spawning dconf if possible."""
+    # The setting is GNOME's, so don't bother probing for it on other desktops
+    desktop = os.environ.get('XDG_CURRENT_DESKTOP')
+    if desktop and 'GNOME' not in desktop.upper().split(':'):
+        return False
+    
+    # Read the setting in-process through GSettings when PyGObject is available
+    try:
+        import gi
+        gi.require_version('Gio', '2.0')
+        from gi.repository import Gio
+    except (ImportError, ValueError):
+        Gio = None
+    if Gio is not None:
+        schema = 'org.gnome.desktop.peripherals.mouse'
+        source = Gio.SettingsSchemaSource.get_default()
+        # Gio.Settings.new() aborts the process for an unknown schema, so check that it's installed first.
+        if source is not None and source.lookup(schema, True) is not None:
+            return Gio.Settings.new(schema).get_boolean('left-handed')
+    
+    try:
+        proc = subprocess.Popen(['dconf', 'read', '/org/gnome/desktop/peripherals/mouse/left-handed'], stdout=subprocess.PIPE)
+        stdout_bytes, stderr_bytes = proc.communicate()
+        return stdout_bytes.decode('utf-8') == 'true\n'
+    except FileNotFoundError:
+        # Non-Gnome environment, assume not swapped
+        return False
+
 def _moveTo(x, y):
     """Moves the mouse pointer to the specified coordinates."""
+    if _at_known_position(x, y):
+        return  # Already there, so skip the round-trip to the compositor.
     _ensure_connected()
     _start_emulating()
     
     # Use absolute motion to move to the exact coordinates
-    _pointer.pointer_motion_absolute(x, y)
+    _send_motion(x, y)
     # Frame event to mark the end of the sequence
-    _pointer.frame()
+    _flush()
+
+def _send_motion(x, y):
+    """Queues an absolute motion event and remembers the position it moved to."""
+    _use_pointer()
+    _pointer.pointer_motion_absolute(x, y)
+    _remember_position(x, y)
+
+def _remember_position(x, y):
+    """Records that the pointer is at (x, y) right now."""
+    global _last_known_position, _last_known_time
+    _last_known_position = (x, y)
+    _last_known_time = time.monotonic()
+
+def _at_known_position(x, y):
+    """Returns True if this module moved the pointer to (x, y) within the last _POSITION_CACHE_TTL seconds."""
+    return (x, y) == _last_known_position and time.monotonic() - _last_known_time < _POSITION_CACHE_TTL
+
+def _at_read_position(x, y):
+    """Returns True if (x, y) is what _position() just read, within the last _POSITION_QUERY_TTL seconds, and the
+    pointer hasn't been moved since."""
+    return ((x, y) == _last_read_position and _last_read_time >= _last_known_time
+            and time.monotonic() - _last_read_time < _POSITION_QUERY_TTL)
 
 def _mouseDown(x, y, button):
     """Presses a mouse button at the specified coordinates."""
-    _ensure_connected()
-    _start_emulating()
-    
-    # Move to position first
-    _pointer.pointer_motion_absolute(x, y)
-    # Send button press event
-    _pointer.button_button(button, True)  # True for press
-    _pointer.frame()
+    # As on X11, pressing a scroll wheel button scrolls one click
+    scroll = _SCROLL_BUTTONS.get(button)
+    if scroll is not None:
+        scroll[0](scroll[1], x, y)
+        return
+    _mouseButtonCode(x, y, _button_code(button), True)
 
 def _mouseUp(x, y, button):
     """Releases a mouse button at the specified coordinates."""
+    if button in _SCROLL_BUTTONS:
+        return  # The scroll already happened when the button was pressed.
+    _mouseButtonCode(x, y, _button_code(button), False)
+
+def _mouseButtonCode(x, y, button, is_press):
+    """Presses or releases the mouse button with the already-translated libei code at the specified coordinates."""
     _ensure_connected()
+    _start_emulating()
     
-    # Move to position first (in case the position changed since mouseDown)
-    _pointer.pointer_motion_absolute(x, y)
-    # Send button release event
-    _pointer.button_button(button, False)  # False for release
-    _pointer.frame()
+    _queue_button(x, y, button, is_press)
+    _flush()
+
+def _queue_button(x, y, button, is_press):
+    """Queues a button press or release at the specified coordinates, without committing it."""
+    # Move to position first, unless the pointer was just moved there (e.g. by the press half of a click).
+    if not _at_known_position(x, y):
+        _send_motion(x, y)
+    # Send button press or release event
+    _use_pointer()
+    _pointer.button_button(button, is_press)
 
 # Map from PyAutoGUI key names to linux/input-event-codes.h key codes
 # This is based on linux/input-event-codes.h and matches the X11 version
-def _build_keyboard_mapping():
-    # Start with all keys set to None
-    mapping = dict([(key, None) for key in pyautogui.KEY_NAMES])
-    
-    # Map alphanumeric keys using their respective input event codes
-    for i, c in enumerate("abcdefghijklmnopqrstuvwxyz"):
-        mapping[c] = 30 + i  # KEY_A is 30, KEY_B is 31, etc.
-        mapping[c.upper()] = 30 + i  # Use same code for uppercase
-
-    # Map numeric keys
-    for i, c in enumerate("1234567890"):
-        mapping[c] = 2 + i  # KEY_1 is 2, KEY_2 is 3, etc.
-    
-    # Map special keys
-    special_keys = {
-        'backspace': 14,      # KEY_BACKSPACE
-        '\b': 14,             # KEY_BACKSPACE
-        'tab': 15,            # KEY_TAB
-        '\t': 15,             # KEY_TAB
-        'enter': 28,          # KEY_ENTER
-        'return': 28,         # KEY_ENTER
-        '\n': 28,             # KEY_ENTER
-        '\r': 28,             # KEY_ENTER
-        'shift': 42,          # KEY_LEFTSHIFT
-        'shiftleft': 42,      # KEY_LEFTSHIFT
-        'shiftright': 54,     # KEY_RIGHTSHIFT
-        'ctrl': 29,           # KEY_LEFTCTRL
-        'ctrlleft': 29,       # KEY_LEFTCTRL
-        'ctrlright': 97,      # KEY_RIGHTCTRL
-        'alt': 56,            # KEY_LEFTALT
-        'altleft': 56,        # KEY_LEFTALT
-        'altright': 100,      # KEY_RIGHTALT
-        'pause': 119,         # KEY_PAUSE
-        'capslock': 58,       # KEY_CAPSLOCK
-        'esc': 1,             # KEY_ESC
-        'escape': 1,          # KEY_ESC
-        '\e': 1,              # KEY_ESC
-        'space': 57,          # KEY_SPACE
-        ' ': 57,              # KEY_SPACE
-        'pageup': 104,        # KEY_PAGEUP
-        'pgup': 104,          # KEY_PAGEUP
-        'pagedown': 109,      # KEY_PAGEDOWN
-        'pgdn': 109,          # KEY_PAGEDOWN
-        'end': 107,           # KEY_END
-        'home': 102,          # KEY_HOME
-        'left': 105,          # KEY_LEFT
-        'up': 103,            # KEY_UP
-        'right': 106,         # KEY_RIGHT
-        'down': 108,          # KEY_DOWN
-        'insert': 110,        # KEY_INSERT
-        'delete': 111,        # KEY_DELETE
-        'del': 111,           # KEY_DELETE
-        'numlock': 69,        # KEY_NUMLOCK
-        'scrolllock': 70,     # KEY_SCROLLLOCK
-        'win': 125,           # KEY_LEFTMETA
-        'winleft': 125,       # KEY_LEFTMETA
-        'winright': 126,      # KEY_RIGHTMETA
-        'apps': 127,          # KEY_COMPOSE
-    }
-    
-    # Add function keys
-    for i in range(1, 25):
-        special_keys[f'f{i}'] = 58 + i  # F1 is KEY_F1 (59), F2 is KEY_F2 (60), etc.
-    
-    # Add numpad keys
-    for i in range(10):
-        special_keys[f'num{i}'] = 96 + i if i > 0 else 82  # KEY_KP1 is 79, etc. but KEY_KP0 is 82
-    
-    special_keys.update({
-        'multiply': 55,    # KEY_KPASTERISK
-        'add': 78,         # KEY_KPPLUS
-        'separator': 83,   # KEY_KPCOMMA
-        'subtract': 74,    # KEY_KPMINUS
-        'decimal': 83,     # KEY_KPDOT
-        'divide': 98,      # KEY_KPSLASH
-    })
-    
-    # Add special characters
-    char_mapping = {
-        '!': 2,            # KEY_1 + SHIFT
-        '@': 3,            # KEY_2 + SHIFT
-        '#': 4,            # KEY_3 + SHIFT
-        '$': 5,            # KEY_4 + SHIFT
-        '%': 6,            # KEY_5 + SHIFT
-        '^': 7,            # KEY_6 + SHIFT
-        '&': 8,            # KEY_7 + SHIFT
-        '*': 9,            # KEY_8 + SHIFT
-        '(': 10,           # KEY_9 + SHIFT
-        ')': 11,           # KEY_0 + SHIFT
-        '-': 12,           # KEY_MINUS
-        '_': 12,           # KEY_MINUS + SHIFT
-        '=': 13,           # KEY_EQUAL
-        '+': 13,           # KEY_EQUAL + SHIFT
-        '[': 26,           # KEY_LEFTBRACE
-        '{': 26,           # KEY_LEFTBRACE + SHIFT
-        ']': 27,           # KEY_RIGHTBRACE
-        '}': 27,           # KEY_RIGHTBRACE + SHIFT
-        '\\': 43,          # KEY_BACKSLASH
-        '|': 43,           # KEY_BACKSLASH + SHIFT
-        ';': 39,           # KEY_SEMICOLON
-        ':': 39,           # KEY_SEMICOLON + SHIFT
-        "'": 40,           # KEY_APOSTROPHE
-        '"': 40,           # KEY_APOSTROPHE + SHIFT
-        '`': 41,           # KEY_GRAVE
-        '~': 41,           # KEY_GRAVE + SHIFT
-        ',': 51,           # KEY_COMMA
-        '<': 51,           # KEY_COMMA + SHIFT
-        '.': 52,           # KEY_DOT
-        '>': 52,           # KEY_DOT + SHIFT
-        '/': 53,           # KEY_SLASH
-        '?': 53,           # KEY_SLASH + SHIFT
-    }
-    
-    mapping.update(special_keys)
-    mapping.update(char_mapping)
-    
-    return mapping
+# Only keys with a real key code are listed, so a single keyboardMapping.get() tells whether a key is supported.
+keyboardMapping = {
+    'backspace': 14,      # KEY_BACKSPACE
+    '\b': 14,             # KEY_BACKSPACE
+    'tab': 15,            # KEY_TAB
+    '\t': 15,             # KEY_TAB
+    'enter': 28,          # KEY_ENTER
+    'return': 28,         # KEY_ENTER
+    '\n': 28,             # KEY_ENTER
+    '\r': 28,             # KEY_ENTER
+    'shift': 42,          # KEY_LEFTSHIFT
+    'shiftleft': 42,      # KEY_LEFTSHIFT
+    'shiftright': 54,     # KEY_RIGHTSHIFT
+    'ctrl': 29,           # KEY_LEFTCTRL
+    'ctrlleft': 29,       # KEY_LEFTCTRL
+    'ctrlright': 97,      # KEY_RIGHTCTRL
+    'alt': 56,            # KEY_LEFTALT
+    'altleft': 56,        # KEY_LEFTALT
+    'altright': 100,      # KEY_RIGHTALT
+    'pause': 119,         # KEY_PAUSE
+    'capslock': 58,       # KEY_CAPSLOCK
+    'esc': 1,             # KEY_ESC
+    'escape': 1,          # KEY_ESC
+    '\e': 1,              # KEY_ESC
+    'space': 57,          # KEY_SPACE
+    ' ': 57,              # KEY_SPACE
+    'pageup': 104,        # KEY_PAGEUP
+    'pgup': 104,          # KEY_PAGEUP
+    'pagedown': 109,      # KEY_PAGEDOWN
+    'pgdn': 109,          # KEY_PAGEDOWN
+    'end': 107,           # KEY_END
+    'home': 102,          # KEY_HOME
+    'left': 105,          # KEY_LEFT
+    'up': 103,            # KEY_UP
+    'right': 106,         # KEY_RIGHT
+    'down': 108,          # KEY_DOWN
+    'insert': 110,        # KEY_INSERT
+    'delete': 111,        # KEY_DELETE
+    'del': 111,           # KEY_DELETE
+    'numlock': 69,        # KEY_NUMLOCK
+    'scrolllock': 70,     # KEY_SCROLLLOCK
+    'win': 125,           # KEY_LEFTMETA
+    'winleft': 125,       # KEY_LEFTMETA
+    'winright': 126,      # KEY_RIGHTMETA
+    'apps': 127,          # KEY_COMPOSE
+
+    # Numpad operators
+    'multiply': 55,       # KEY_KPASTERISK
+    'add': 78,            # KEY_KPPLUS
+    'separator': 83,      # KEY_KPCOMMA
+    'subtract': 74,       # KEY_KPMINUS
+    'decimal': 83,        # KEY_KPDOT
+    'divide': 98,         # KEY_KPSLASH
+
+    # Special characters
+    '!': 2,            # KEY_1 + SHIFT
+    '@': 3,            # KEY_2 + SHIFT
+    '#': 4,            # KEY_3 + SHIFT
+    '$': 5,            # KEY_4 + SHIFT
+    '%': 6,            # KEY_5 + SHIFT
+    '^': 7,            # KEY_6 + SHIFT
+    '&': 8,            # KEY_7 + SHIFT
+    '*': 9,            # KEY_8 + SHIFT
+    '(': 10,           # KEY_9 + SHIFT
+    ')': 11,           # KEY_0 + SHIFT
+    '-': 12,           # KEY_MINUS
+    '_': 12,           # KEY_MINUS + SHIFT
+    '=': 13,           # KEY_EQUAL
+    '+': 13,           # KEY_EQUAL + SHIFT
+    '[': 26,           # KEY_LEFTBRACE
+    '{': 26,           # KEY_LEFTBRACE + SHIFT
+    ']': 27,           # KEY_RIGHTBRACE
+    '}': 27,           # KEY_RIGHTBRACE + SHIFT
+    '\\': 43,          # KEY_BACKSLASH
+    '|': 43,           # KEY_BACKSLASH + SHIFT
+    ';': 39,           # KEY_SEMICOLON
+    ':': 39,           # KEY_SEMICOLON + SHIFT
+    "'": 40,           # KEY_APOSTROPHE
+    '"': 40,           # KEY_APOSTROPHE + SHIFT
+    '`': 41,           # KEY_GRAVE
+    '~': 41,           # KEY_GRAVE + SHIFT
+    ',': 51,           # KEY_COMMA
+    '<': 51,           # KEY_COMMA + SHIFT
+    '.': 52,           # KEY_DOT
+    '>': 52,           # KEY_DOT + SHIFT
+    '/': 53,           # KEY_SLASH
+    '?': 53,           # KEY_SLASH + SHIFT
+}
+
+# Map alphanumeric keys using their respective input event codes
+for i, c in enumerate("abcdefghijklmnopqrstuvwxyz"):
+    keyboardMapping[c] = 30 + i  # KEY_A is 30, KEY_B is 31, etc.
+    keyboardMapping[c.upper()] = 30 + i  # Use same code for uppercase
 
-keyboardMapping = _build_keyboard_mapping()
+# Map numeric keys
+for i, c in enumerate("1234567890"):
+    keyboardMapping[c] = 2 + i  # KEY_1 is 2, KEY_2 is 3, etc.
+
+# Add function keys
+for i in range(1, 25):
+    keyboardMapping[f'f{i}'] = 58 + i  # F1 is KEY_F1 (59), F2 is KEY_F2 (60), etc.
+
+# Add numpad keys
+for i in range(10):
+    keyboardMapping[f'num{i}'] = 96 + i if i > 0 else 82  # KEY_KP1 is 79, etc. but KEY_KP0 is 82
+
+# The mapping is complete at this point, so expose it read-only
+keyboardMapping = types.MappingProxyType(keyboardMapping)
+
+_SHIFT_CODE = keyboardMapping['shift']
+
+# The mapped characters that pyautogui.isShiftCharacter() considers shifted, precomputed for a single set lookup per key.
+_SHIFT_CHARS = frozenset('~!@#$%^&*()_+{}|:"<>?' + string.ascii_uppercase)
+
+def _translate_key(key):
+    """Returns the key code for the key and whether it needs shift held down. The code is None for unsupported keys."""
+    # Direct keycodes are sent as they are, without a keyboardMapping lookup
+    if isinstance(key, int):
+        return key, False
+    # Handle shift for uppercase letters and special characters
+    return keyboardMapping.get(key), key in _SHIFT_CHARS
 
 def _keyDown(key):
     """Performs a keyboard key press without the release."""
-    if key not in keyboardMapping or keyboardMapping[key] is None:
+    code, needsShift = _translate_key(key)
+    if code is None:
         return
 
     _ensure_connected()
     _start_emulating()
     
-    # Handle direct keycodes
-    if isinstance(key, int):
-        _keyboard.keyboard_key(key, True)  # True for press
-        _keyboard.frame()
-        return
-
-    # Handle shift for uppercase letters and special characters
-    needsShift = pyautogui.isShiftCharacter(key)
+    # The shift and key events are committed together with a single frame.
+    _use_keyboard()
     if needsShift:
-        _keyboard.keyboard_key(42, True)  # 42 is KEY_LEFTSHIFT
-        _keyboard.frame()
-    
-    _keyboard.keyboard_key(keyboardMapping[key], True)  # True for press
-    _keyboard.frame()
+        _keyboard.keyboard_key(_SHIFT_CODE, True)
+    _keyboard.keyboard_key(code, True)  # True for press
+    _flush()
 
 def _keyUp(key):
     """Performs a keyboard key release."""
-    if key not in keyboardMapping or keyboardMapping[key] is None:
+    code, needsShift = _translate_key(key)
+    if code is None:
         return
 
     _ensure_connected()
     
-    # Handle direct keycodes
-    if isinstance(key, int):
-        _keyboard.keyboard_key(key, False)  # False for release
-        _keyboard.frame()
+    _use_keyboard()
+    _keyboard.keyboard_key(code, False)  # False for release
+    if needsShift:
+        _keyboard.keyboard_key(_SHIFT_CODE, False)
+    _flush()
+
+def _press(key):
+    """Performs a keyboard key press followed by its release, committed with a single frame."""
+    code, needsShift = _translate_key(key)
+    if code is None:
         return
 
-    _keyboard.keyboard_key(keyboardMapping[key], False)  # False for release
-    _keyboard.frame()
+    _ensure_connected()
+    _start_emulating()
     
-    # Handle shift for uppercase letters and special characters
-    needsShift = pyautogui.isShiftCharacter(key)
+    _use_keyboard()
     if needsShift:
-        _keyboard.keyboard_key(42, False)  # 42 is KEY_LEFTSHIFT
-        _keyboard.frame()
\ No newline at end of file
+        _keyboard.keyboard_key(_SHIFT_CODE, True)
+    _keyboard.keyboard_key(code, True)
+    _keyboard.keyboard_key(code, False)
+    if needsShift:
+        _keyboard.keyboard_key(_SHIFT_CODE, False)
+    _flush()
+
+def _typewrite(keys):
+    """Presses and releases each of the keys in order. All of the keys are translated up front and then committed
+    together with a single frame."""
+    # Unsupported keys are dropped here, so the loop below only has supported ones to send
+    translated = [(code, needsShift) for code, needsShift in map(_translate_key, keys) if code is not None]
+    if not translated:
+        return
+
+    _ensure_connected()
+    _start_emulating()
+    
+    _use_keyboard()
+    keyboard_key = _keyboard.keyboard_key
+    for code, needsShift in translated:
+        if needsShift:
+            keyboard_key(_SHIFT_CODE, True)
+        keyboard_key(code, True)
+        keyboard_key(code, False)
+        if needsShift:
+            keyboard_key(_SHIFT_CODE, False)
+    _flush()
@@ -70,8 +70,9 @@ def _scroll(clicks, x=None, y=None):
 
 
 def _click(x, y, button):
-    assert button in BUTTON_NAME_MAPPING.keys(), "button argument not in ('left', 'middle', 'right', 4, 5, 6, 7)"
-    button = BUTTON_NAME_MAPPING[button]
+    button = BUTTON_NAME_MAPPING.get(button)
+    if button is None:
+        raise AssertionError("button argument not in ('left', 'middle', 'right', 4, 5, 6, 7)")
 
     _mouseDown(x, y, button)
     _mouseUp(x, y, button)
@@ -104,16 +105,18 @@ def _moveTo(x, y):
 
 def _mouseDown(x, y, button):
     _moveTo(x, y)
-    assert button in BUTTON_NAME_MAPPING.keys(), "button argument not in ('left', 'middle', 'right', 4, 5, 6, 7)"
-    button = BUTTON_NAME_MAPPING[button]
+    button = BUTTON_NAME_MAPPING.get(button)
+    if button is None:
+        raise AssertionError("button argument not in ('left', 'middle', 'right', 4, 5, 6, 7)")
     fake_input(_display, X.ButtonPress, button)
     _display.sync()
 
 
 def _mouseUp(x, y, button):
     _moveTo(x, y)
-    assert button in BUTTON_NAME_MAPPING.keys(), "button argument not in ('left', 'middle', 'right', 4, 5, 6, 7)"
-    button = BUTTON_NAME_MAPPING[button]
+    button = BUTTON_NAME_MAPPING.get(button)
+    if button is None:
+        raise AssertionError("button argument not in ('left', 'middle', 'right', 4, 5, 6, 7)")
     fake_input(_display, X.ButtonRelease, button)
     _display.sync()
 
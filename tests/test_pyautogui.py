@@ -121,10 +121,12 @@ class TestGeneral(unittest.TestCase):
         pyautogui.keyUp
         pyautogui.press
         pyautogui.hold
+        pyautogui.batch
 
         # The functions implemented in the platform-specific modules should also show up in the pyautogui namespace:
         pyautogui.position
         pyautogui.size
+        pyautogui.invalidateScreenSize
         pyautogui.scroll
         pyautogui.hscroll
         pyautogui.vscroll
@@ -657,6 +659,17 @@ class HoldThread(threading.Thread):
                 pass
 
 
+class BatchThread(threading.Thread):
+    def __init__(self, msg):
+        super(BatchThread, self).__init__()
+        self.msg = msg
+
+    def run(self):
+        time.sleep(0.25)  # NOTE: BE SURE TO ACCOUNT FOR THIS QUARTER SECOND FOR TIMING TESTS!
+        with pyautogui.batch():
+            pyautogui.typewrite(self.msg)
+
+
 class TestKeyboard(unittest.TestCase):
     # NOTE: The terminal window running this script must be in focus during the keyboard tests.
     # You cannot run this as a scheduled task or remotely.
@@ -793,6 +806,18 @@ class TestKeyboard(unittest.TestCase):
         response = INPUT_FUNC()
         self.assertEqual(response, "AB")
 
+    def test_batch(self):
+        # Events held back by batch() must still all arrive, in order, when the block exits.
+        t = BatchThread("Hello world!\n")
+        t.start()
+        response = INPUT_FUNC()
+        self.assertEqual(response, "Hello world!")
+
+        t = BatchThread(["a", "b", "c", "left", "x", "\n"])
+        t.start()
+        response = INPUT_FUNC()
+        self.assertEqual(response, "abxc")
+
     def test_typewrite_space(self):
         # Backspace test
         t = TypewriteThread(["space", " ", "\n"])  # test both 'space' and ' '
@@ -0,0 +1,526 @@
+from __future__ import division, print_function
+
+import enum
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+import types
+import unittest
+from unittest import mock
+
+# These tests drive the Wayland backend against a stand-in for snegg that records the libei calls it receives, so
+# they don't need a compositor. The backend module is loaded straight from its file, since importing the pyautogui
+# package itself would load the backend for the platform the tests happen to run on.
+backendPath = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "pyautogui", "_pyautogui_wayland.py")
+
+
+class EventType(enum.Enum):
+    SEAT_ADDED = 1
+    DEVICE_ADDED = 2
+
+
+class DeviceCapability(enum.Enum):
+    POINTER = 1
+    POINTER_ABSOLUTE = 2
+    BUTTON = 3
+    KEYBOARD = 4
+    SCROLL = 5
+
+
+class FakeDevice(object):
+    """Records every method called on it in the shared calls list, as (device name, method name, *args) tuples."""
+
+    def __init__(self, name, capabilities, calls):
+        self.name = name
+        self.capabilities = capabilities
+        self.calls = calls
+
+    def __getattr__(self, attr):
+        return lambda *args: self.calls.append((self.name, attr) + args)
+
+
+class FakeEvent(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeSeat(object):
+    def bind(self, capabilities):
+        pass
+
+
+class FakeSender(object):
+    """Announces one seat on the first dispatch() and a pointer and a keyboard device on the second."""
+
+    calls = None
+
+    @classmethod
+    def create_for_socket(cls, path, name):
+        return cls()
+
+    def __init__(self):
+        self.dispatches = 0
+        self.events = []
+
+    def dispatch(self):
+        self.dispatches += 1
+        if self.dispatches == 1:
+            self.events = [FakeEvent(event_type=EventType.SEAT_ADDED, seat=FakeSeat())]
+        else:
+            self.events = [
+                FakeEvent(
+                    event_type=EventType.DEVICE_ADDED,
+                    device=FakeDevice("pointer", {DeviceCapability.POINTER}, FakeSender.calls),
+                ),
+                FakeEvent(
+                    event_type=EventType.DEVICE_ADDED,
+                    device=FakeDevice("keyboard", {DeviceCapability.KEYBOARD}, FakeSender.calls),
+                ),
+            ]
+
+
+def makeFakeSnegg():
+    snegg = types.ModuleType("snegg")
+    snegg.ei = types.ModuleType("snegg.ei")
+    snegg.ei.EventType = EventType
+    snegg.ei.DeviceCapability = DeviceCapability
+    snegg.ei.Sender = FakeSender
+    return snegg
+
+
+class WaylandTestCase(unittest.TestCase):
+    def setUp(self):
+        # Load a fresh copy of the backend for every test, since it keeps its connection and caches in module globals.
+        self.calls = []
+        FakeSender.calls = self.calls
+        modulePatcher = mock.patch.dict(sys.modules, self.fakeModules())
+        modulePatcher.start()
+        self.addCleanup(modulePatcher.stop)
+
+        spec = importlib.util.spec_from_file_location("_pyautogui_wayland", backendPath)
+        self.wayland = importlib.util.module_from_spec(spec)
+        with mock.patch("atexit.register"):
+            spec.loader.exec_module(self.wayland)
+
+    def fakeModules(self):
+        """Returns the modules to put in sys.modules while the backend loads. By default, python-xlib is made
+        unimportable to keep the tests away from any real X server."""
+        snegg = makeFakeSnegg()
+        return {"snegg": snegg, "snegg.ei": snegg.ei, "Xlib": None, "Xlib.display": None, "Xlib.error": None}
+
+    def sentCalls(self):
+        """Returns the recorded libei calls, without the start_emulating() calls made on first use."""
+        return [call for call in self.calls if call[1] != "start_emulating"]
+
+
+class TestWaylandFrames(WaylandTestCase):
+    def test_batch(self):
+        with self.wayland._batch():
+            self.wayland._moveTo(10, 20)
+            self.wayland._moveTo(30, 40)
+            self.assertNotIn(("pointer", "frame"), self.sentCalls())
+        self.assertEqual(
+            self.sentCalls(),
+            [
+                ("pointer", "pointer_motion_absolute", 10, 20),
+                ("pointer", "pointer_motion_absolute", 30, 40),
+                ("pointer", "frame"),
+            ],
+        )
+
+    def test_batch_keyboard_then_pointer(self):
+        # The keyboard's events are framed as soon as the pointer is used, so they are committed before the click.
+        with self.wayland._batch():
+            self.wayland._press("a")
+            self.wayland._click(10, 20, "left")
+            self.assertNotIn(("pointer", "frame"), self.sentCalls())
+        self.assertEqual(
+            self.sentCalls(),
+            [
+                ("keyboard", "keyboard_key", 30, True),
+                ("keyboard", "keyboard_key", 30, False),
+                ("keyboard", "frame"),
+                ("pointer", "pointer_motion_absolute", 10, 20),
+                ("pointer", "button_button", 0x110, True),
+                ("pointer", "button_button", 0x110, False),
+                ("pointer", "frame"),
+            ],
+        )
+
+    def test_batch_pointer_then_keyboard(self):
+        with self.wayland._batch():
+            self.wayland._moveTo(10, 20)
+            self.wayland._press("a")
+            self.assertNotIn(("keyboard", "frame"), self.sentCalls())
+        self.assertEqual(
+            self.sentCalls(),
+            [
+                ("pointer", "pointer_motion_absolute", 10, 20),
+                ("pointer", "frame"),
+                ("keyboard", "keyboard_key", 30, True),
+                ("keyboard", "keyboard_key", 30, False),
+                ("keyboard", "frame"),
+            ],
+        )
+
+    def test_frames_only_used_device(self):
+        self.wayland._moveTo(10, 20)
+        self.assertEqual(self.sentCalls(), [("pointer", "pointer_motion_absolute", 10, 20), ("pointer", "frame")])
+        del self.calls[:]
+
+        self.wayland._keyDown("a")
+        self.wayland._keyUp("a")
+        self.assertEqual(
+            self.sentCalls(),
+            [
+                ("keyboard", "keyboard_key", 30, True),
+                ("keyboard", "frame"),
+                ("keyboard", "keyboard_key", 30, False),
+                ("keyboard", "frame"),
+            ],
+        )
+
+    def test_moveTo_same_position(self):
+        self.wayland._moveTo(10, 20)
+        # Moving to where the pointer was just sent doesn't send anything.
+        self.wayland._moveTo(10, 20)
+        self.assertEqual(self.sentCalls(), [("pointer", "pointer_motion_absolute", 10, 20), ("pointer", "frame")])
+
+    def test_keyDown_shifted(self):
+        self.wayland._keyDown("A")
+        self.assertEqual(
+            self.sentCalls(),
+            [("keyboard", "keyboard_key", 42, True), ("keyboard", "keyboard_key", 30, True), ("keyboard", "frame")],
+        )
+
+    def test_scroll(self):
+        self.wayland._vscroll(3, 10, 20)
+        self.assertEqual(
+            self.sentCalls(),
+            [
+                ("pointer", "pointer_motion_absolute", 10, 20),
+                ("pointer", "scroll_delta", 0, -3),
+                ("pointer", "scroll_discrete", 0, -3),
+                ("pointer", "scroll_stop", False, True),
+                ("pointer", "frame"),
+            ],
+        )
+
+    def test_click(self):
+        self.wayland._click(10, 20, "left")
+        self.assertEqual(
+            self.sentCalls(),
+            [
+                ("pointer", "pointer_motion_absolute", 10, 20),
+                ("pointer", "button_button", 0x110, True),  # BTN_LEFT
+                ("pointer", "button_button", 0x110, False),
+                ("pointer", "frame"),
+            ],
+        )
+
+    def test_press(self):
+        self.wayland._press("A")
+        self.assertEqual(
+            self.sentCalls(),
+            [
+                ("keyboard", "keyboard_key", 42, True),
+                ("keyboard", "keyboard_key", 30, True),
+                ("keyboard", "keyboard_key", 30, False),
+                ("keyboard", "keyboard_key", 42, False),
+                ("keyboard", "frame"),
+            ],
+        )
+
+    def test_press_keycode(self):
+        # Integer keys are sent as key codes as they are.
+        self.wayland._press(30)
+        self.assertEqual(
+            self.sentCalls(),
+            [("keyboard", "keyboard_key", 30, True), ("keyboard", "keyboard_key", 30, False), ("keyboard", "frame")],
+        )
+
+    def test_typewrite(self):
+        self.wayland._typewrite("a1")
+        self.assertEqual(
+            self.sentCalls(),
+            [
+                ("keyboard", "keyboard_key", 30, True),
+                ("keyboard", "keyboard_key", 30, False),
+                ("keyboard", "keyboard_key", 2, True),
+                ("keyboard", "keyboard_key", 2, False),
+                ("keyboard", "frame"),
+            ],
+        )
+
+    def test_invalid_button(self):
+        with self.assertRaises(ValueError):
+            self.wayland._click(10, 20, "sideways")
+        self.assertEqual(self.sentCalls(), [])
+
+    def test_button_codes(self):
+        # Buttons are sent as linux/input-event-codes.h codes, not X11 button numbers.
+        for button, code in (("left", 0x110), ("middle", 0x112), ("right", 0x111), (1, 0x110), (2, 0x112), (3, 0x111)):
+            del self.calls[:]
+            self.wayland._mouseDown(10, 20, button)
+            self.wayland._mouseUp(10, 20, button)
+            self.assertIn(("pointer", "button_button", code, True), self.sentCalls())
+            self.assertIn(("pointer", "button_button", code, False), self.sentCalls())
+
+    def test_scroll_buttons(self):
+        # X11 buttons 4 to 7 scroll instead of sending a button event.
+        for button, scroll in ((4, (0, -1)), (5, (0, 1)), (6, (-1, 0)), (7, (1, 0))):
+            del self.calls[:]
+            self.wayland._click(10, 20, button)
+            self.assertIn(("pointer", "scroll_discrete") + scroll, self.sentCalls())
+            self.assertNotIn("button_button", [call[1] for call in self.sentCalls()])
+
+
+class TestWaylandSize(WaylandTestCase):
+    def test_size_cache(self):
+        output = b"XWAYLAND0 connected primary 2560x1440+0+0 (normal left inverted right x axis y axis) 600mm x 340mm\n"
+        with mock.patch("subprocess.check_output", return_value=output) as checkOutput:
+            self.assertEqual(self.wayland._size(), (2560, 1440))
+            # The size is cached until the cache is cleared.
+            self.assertEqual(self.wayland._size(), (2560, 1440))
+            self.assertEqual(checkOutput.call_count, 1)
+            self.wayland._clear_size_cache()
+            self.assertEqual(self.wayland._size(), (2560, 1440))
+            self.assertEqual(checkOutput.call_count, 2)
+
+    def test_size_xrandr_timeout(self):
+        with mock.patch("subprocess.check_output", side_effect=subprocess.TimeoutExpired(["xrandr"], 2)) as checkOutput:
+            self.assertEqual(self.wayland._size(), (1920, 1080))
+        self.assertEqual(checkOutput.call_args[1]["timeout"], 2)
+
+    def test_size_without_xrandr(self):
+        with mock.patch("subprocess.check_output", side_effect=FileNotFoundError):
+            self.assertEqual(self.wayland._size(), (1920, 1080))
+
+    def test_size_xrandr(self):
+        output = (
+            b"Screen 0: minimum 16 x 16, current 3840 x 1440, maximum 32767 x 32767\n"
+            b"XWAYLAND0 connected 1280x1024+2560+0 (normal left inverted right x axis y axis) 340mm x 270mm\n"
+            b"XWAYLAND1 connected primary 2560x1440+0+0 (normal left inverted right x axis y axis) 600mm x 340mm\n"
+        )
+        with mock.patch("subprocess.check_output", return_value=output):
+            self.assertEqual(self.wayland._size(), (2560, 1440))
+
+
+class TestWaylandPosition(WaylandTestCase):
+    def test_position_xdotool(self):
+        with mock.patch("subprocess.check_output", return_value=b"x:12 y:34 screen:0 window:1\n"):
+            self.assertEqual(self.wayland._position(), (12, 34))
+
+    def test_position_without_xdotool(self):
+        with mock.patch("subprocess.check_output", side_effect=FileNotFoundError) as checkOutput:
+            self.assertEqual(self.wayland._position(), (0, 0))
+            # Once xdotool is known to be missing, it isn't run again.
+            time.sleep(self.wayland._POSITION_QUERY_TTL)
+            self.assertEqual(self.wayland._position(), (0, 0))
+            self.assertEqual(checkOutput.call_count, 1)
+
+    def test_read_position_does_not_skip_motion(self):
+        # A position read back from XWayland may be stale, so moving to it must still send the motion.
+        with mock.patch("subprocess.check_output", return_value=b"x:12 y:34 screen:0 window:1\n"):
+            x, y = self.wayland._position()
+        self.wayland._moveTo(x, y)
+        self.assertEqual(self.sentCalls(), [("pointer", "pointer_motion_absolute", 12, 34), ("pointer", "frame")])
+
+    def test_scroll_at_read_position(self):
+        # pyautogui.scroll() without coordinates passes in the position it just read, which may be stale under
+        # XWayland, so the scroll is sent wherever the pointer is instead of moving it there.
+        with mock.patch("subprocess.check_output", return_value=b"x:12 y:34 screen:0 window:1\n"):
+            self.wayland._position()
+            x, y = self.wayland._position()
+        self.wayland._vscroll(3, x, y)
+        self.assertNotIn(("pointer", "pointer_motion_absolute", 12, 34), self.sentCalls())
+        self.assertEqual(self.sentCalls()[-1], ("pointer", "frame"))
+
+
+class XlibError(Exception):
+    pass
+
+
+class XlibDisplayError(Exception):
+    pass
+
+
+class XlibConnectionClosedError(Exception):
+    pass
+
+
+def makeFakeXlib(Display):
+    Xlib = types.ModuleType("Xlib")
+    Xlib.display = types.ModuleType("Xlib.display")
+    Xlib.display.Display = Display
+    Xlib.error = types.ModuleType("Xlib.error")
+    Xlib.error.XError = XlibError
+    Xlib.error.DisplayError = XlibDisplayError
+    Xlib.error.ConnectionClosedError = XlibConnectionClosedError
+    return Xlib
+
+
+class XlibTestCase(WaylandTestCase):
+    """Loads the backend with a stand-in for python-xlib, whose Display() returns a new mock display every call."""
+
+    def setUp(self):
+        self.displays = []
+        self.Display = mock.Mock(side_effect=self.makeDisplay)
+        environPatcher = mock.patch.dict(os.environ, {"DISPLAY": ":0"})
+        environPatcher.start()
+        self.addCleanup(environPatcher.stop)
+        super(XlibTestCase, self).setUp()
+
+    def fakeModules(self):
+        modules = super(XlibTestCase, self).fakeModules()
+        Xlib = makeFakeXlib(self.Display)
+        modules.update({"Xlib": Xlib, "Xlib.display": Xlib.display, "Xlib.error": Xlib.error})
+        return modules
+
+    def makeDisplay(self):
+        display = mock.MagicMock()
+        root = display.screen.return_value.root
+        root.query_pointer.return_value = types.SimpleNamespace(root_x=56, root_y=78)
+        root.xrandr_get_screen_resources_current.return_value = types.SimpleNamespace(config_timestamp=1234)
+        root.xrandr_get_output_primary.return_value = types.SimpleNamespace(output=5)
+        display.xrandr_get_output_info.return_value = types.SimpleNamespace(crtc=7)
+        display.xrandr_get_crtc_info.return_value = types.SimpleNamespace(width=2560, height=1440)
+        self.displays.append(display)
+        return display
+
+
+class TestWaylandXlibSize(XlibTestCase):
+    def test_size_randr(self):
+        with mock.patch("subprocess.check_output") as checkOutput:
+            self.assertEqual(self.wayland._size(), (2560, 1440))
+        self.assertFalse(checkOutput.called)
+        display = self.displays[0]
+        display.xrandr_get_output_info.assert_called_once_with(5, 1234)
+        display.xrandr_get_crtc_info.assert_called_once_with(7, 1234)
+
+    def test_size_randr_error(self):
+        # e.g. BadOutput when there is no primary output, so fall back to xrandr.
+        self.Display.side_effect = None
+        self.Display.return_value = self.makeDisplay()
+        self.Display.return_value.screen.return_value.root.xrandr_get_output_primary.side_effect = XlibError
+        output = b"XWAYLAND0 connected primary 1280x1024+0+0 (normal left inverted right x axis y axis) 340mm x 270mm\n"
+        with mock.patch("subprocess.check_output", return_value=output):
+            self.assertEqual(self.wayland._size(), (1280, 1024))
+
+    def test_size_randr_no_crtc(self):
+        # An output with no active CRTC reports a 0x0 size, which isn't used.
+        self.Display.side_effect = None
+        self.Display.return_value = self.makeDisplay()
+        self.Display.return_value.xrandr_get_crtc_info.return_value = types.SimpleNamespace(width=0, height=0)
+        with mock.patch("subprocess.check_output", side_effect=FileNotFoundError):
+            self.assertEqual(self.wayland._size(), (1920, 1080))
+
+
+class TestWaylandXlibConnection(XlibTestCase):
+    def test_shared_display(self):
+        self.assertEqual(self.wayland._position(), (56, 78))
+        self.assertEqual(self.wayland._size(), (2560, 1440))
+        # The position and size queries share one connection.
+        self.assertEqual(self.Display.call_count, 1)
+
+    def test_reconnect_after_connection_closed(self):
+        self.assertEqual(self.wayland._position(), (56, 78))
+        self.displays[0].screen.return_value.root.query_pointer.side_effect = XlibConnectionClosedError
+        time.sleep(self.wayland._POSITION_QUERY_TTL)
+        with mock.patch("subprocess.check_output", return_value=b"x:12 y:34 screen:0 window:1\n"):
+            self.assertEqual(self.wayland._position(), (12, 34))
+
+        # The closed connection was dropped, so the next query opens a new one.
+        time.sleep(self.wayland._POSITION_QUERY_TTL)
+        self.assertEqual(self.wayland._position(), (56, 78))
+        self.assertEqual(self.Display.call_count, 2)
+
+    def test_size_reconnect_after_connection_closed(self):
+        self.Display.side_effect = None
+        self.Display.return_value = self.makeDisplay()
+        self.Display.return_value.screen.return_value.root.xrandr_get_screen_resources_current.side_effect = (
+            XlibConnectionClosedError
+        )
+        with mock.patch("subprocess.check_output", side_effect=FileNotFoundError):
+            self.assertEqual(self.wayland._size(), (1920, 1080))
+        self.assertIsNone(self.wayland._xdisplay)
+
+    def test_display_error(self):
+        self.Display.side_effect = XlibDisplayError
+        with mock.patch("subprocess.check_output", return_value=b"x:12 y:34 screen:0 window:1\n"):
+            self.assertEqual(self.wayland._position(), (12, 34))
+
+    def test_no_display_variable(self):
+        with mock.patch.dict(os.environ, clear=True):
+            with mock.patch("subprocess.check_output", return_value=b"x:12 y:34 screen:0 window:1\n"):
+                self.assertEqual(self.wayland._position(), (12, 34))
+        self.assertFalse(self.Display.called)
+
+
+class TestWaylandMouseSwap(WaylandTestCase):
+    def fakeGi(self, schemaInstalled=True, leftHanded=True):
+        """Returns the modules for a stand-in PyGObject, whose GSettings has the given left-handed setting."""
+        gi = types.ModuleType("gi")
+        gi.require_version = mock.Mock()
+        gi.repository = types.ModuleType("gi.repository")
+        gi.repository.Gio = Gio = mock.MagicMock()
+        Gio.SettingsSchemaSource.get_default.return_value.lookup.return_value = object() if schemaInstalled else None
+        Gio.Settings.new.return_value.get_boolean.return_value = leftHanded
+        return {"gi": gi, "gi.repository": gi.repository}
+
+    def dconf(self, output):
+        """Replaces subprocess.Popen for the rest of the test, with dconf printing the given output."""
+        patcher = mock.patch("subprocess.Popen")
+        popen = patcher.start()
+        self.addCleanup(patcher.stop)
+        popen.return_value.communicate.return_value = (output, None)
+        return popen
+
+    def test_other_desktop(self):
+        # The setting is GNOME's, so nothing is queried on other desktops.
+        modules = self.fakeGi()
+        popen = self.dconf(b"true\n")
+        with mock.patch.dict(os.environ, {"XDG_CURRENT_DESKTOP": "KDE"}), mock.patch.dict(sys.modules, modules):
+            self.assertFalse(self.wayland._mouse_is_swapped())
+        self.assertFalse(modules["gi.repository"].Gio.Settings.new.called)
+        self.assertFalse(popen.called)
+
+    def test_gsettings(self):
+        modules = self.fakeGi()
+        popen = self.dconf(b"false\n")
+        environ = {"XDG_CURRENT_DESKTOP": "ubuntu:GNOME"}
+        with mock.patch.dict(os.environ, environ), mock.patch.dict(sys.modules, modules):
+            self.assertTrue(self.wayland._mouse_is_swapped())
+        Gio = modules["gi.repository"].Gio
+        Gio.Settings.new.assert_called_once_with("org.gnome.desktop.peripherals.mouse")
+        Gio.Settings.new.return_value.get_boolean.assert_called_once_with("left-handed")
+        self.assertFalse(popen.called)
+
+    def test_gsettings_missing_schema(self):
+        # Gio.Settings.new() aborts the process for an unknown schema, so it must not be called, and dconf is used.
+        modules = self.fakeGi(schemaInstalled=False)
+        popen = self.dconf(b"true\n")
+        with mock.patch.dict(os.environ, {"XDG_CURRENT_DESKTOP": "GNOME"}), mock.patch.dict(sys.modules, modules):
+            self.assertTrue(self.wayland._mouse_is_swapped())
+        self.assertFalse(modules["gi.repository"].Gio.Settings.new.called)
+        self.assertTrue(popen.called)
+
+    def test_dconf_without_gi(self):
+        popen = self.dconf(b"false\n")
+        with mock.patch.dict(os.environ, {"XDG_CURRENT_DESKTOP": "GNOME"}), mock.patch.dict(sys.modules, {"gi": None}):
+            self.assertFalse(self.wayland._mouse_is_swapped())
+            # The result is cached, so dconf only runs once.
+            self.assertFalse(self.wayland._mouse_is_swapped())
+        self.assertEqual(popen.call_count, 1)
+        self.assertEqual(popen.call_args[0][0], ["dconf", "read", "/org/gnome/desktop/peripherals/mouse/left-handed"])
+
+    def test_without_dconf(self):
+        with mock.patch.dict(os.environ, {"XDG_CURRENT_DESKTOP": "GNOME"}), mock.patch.dict(sys.modules, {"gi": None}):
+            with mock.patch("subprocess.Popen", side_effect=FileNotFoundError):
+                self.assertFalse(self.wayland._mouse_is_swapped())
+
+
+if __name__ == "__main__":
+    unittest.main()